@@ -26,14 +26,6 @@ const mvpStack = new GraceMvpStack(app, 'GraceMvpStack', {
   isProduction
 });
 
-// Create the API stack with Cognito, API Gateway, and Lambda
-const apiStack = new GraceApiStack(app, 'GraceApiStack', {
-  env,
-  description: 'API layer for GRACE with Cognito authentication and API Gateway',
-  ledgerBucketName: mvpStack.ledgerBucket.bucketName,
-  isProduction
-});
-
 // Create the S3 stack with updated Node.js 20 Lambda function
 const s3Stack = new GraceS3Stack(app, 'GraceS3Stack', {
   env,
@@ -48,6 +40,16 @@ const foundationStack = new GraceFoundationStack(app, 'GraceFoundationStack', {
   isProduction
 });
 
+// Create the API stack with Cognito, API Gateway, and Lambda
+const apiStack = new GraceApiStack(app, 'GraceApiStack', {
+  env,
+  description: 'API layer for GRACE with Cognito authentication and API Gateway',
+  ledgerBucketName: mvpStack.ledgerBucket.bucketName,
+  databaseSecret: foundationStack.databaseSecret,
+  databaseClusterArn: foundationStack.database.clusterArn,
+  isProduction
+});
+
 // Create the logic stack as a nested stack
 const logicStack = new GraceLogicStack(foundationStack, 'GraceLogicStack', {
   description: 'Business logic layer for the GRACE project including Lambda functions',
@@ -4,11 +4,184 @@ import boto3
 import hashlib
 import base64
 import time
+import io
+import gzip
+import tarfile
+import zipfile
+import zlib
+import lzma
 from datetime import datetime
+from botocore.exceptions import BotoCoreError, ClientError
 
 # Initialize AWS clients
 s3_client = boto3.client('s3')
 
+# Size of the chunks read from S3 when hashing archive members
+CHUNK_SIZE = 1024 * 1024
+
+# Errors that mean an archive could not be read, as opposed to a bug in the handler
+ARCHIVE_ERRORS = (
+    tarfile.TarError,
+    zipfile.BadZipFile,
+    zlib.error,
+    lzma.LZMAError,
+    # zipfile raises these for encrypted members and unsupported compression methods
+    RuntimeError,
+    NotImplementedError,
+    ClientError,
+    BotoCoreError,
+    OSError,
+    EOFError
+)
+
+# Archive formats recognised from the object key
+ARCHIVE_SUFFIXES = [
+    ('.tar.gz', 'tar'),
+    ('.tgz', 'tar'),
+    ('.tar.bz2', 'tar'),
+    ('.tar.xz', 'tar'),
+    ('.tar', 'tar'),
+    ('.zip', 'zip'),
+    ('.gz', 'gzip')
+]
+
+class S3RangeReader(io.RawIOBase):
+    """Seekable read-only file over an S3 object, backed by ranged GET requests
+
+    One GET body is kept open and read sequentially; a new ranged GET is only
+    started when a seek moves away from where that body currently is.
+    """
+
+    def __init__(self, bucket, key, size, etag):
+        self.bucket = bucket
+        self.key = key
+        self.size = size
+        self.etag = etag
+        self.position = 0
+        self.body = None
+        self.body_position = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        return self.position
+
+    def close(self):
+        self.close_body()
+        super().close()
+
+    def close_body(self):
+        if self.body is not None:
+            self.body.close()
+            self.body = None
+            self.body_position = None
+
+    def readinto(self, buffer):
+        if self.position >= self.size or len(buffer) == 0:
+            return 0
+
+        if self.body is None or self.body_position != self.position:
+            # Read from here to the end of the object; later sequential reads reuse the body
+            self.close_body()
+            response = s3_client.get_object(
+                Bucket=self.bucket,
+                Key=self.key,
+                Range=f"bytes={self.position}-",
+                # Fail rather than mix bytes if the object is overwritten mid-scan
+                IfMatch=self.etag
+            )
+            self.body = response['Body']
+            self.body_position = self.position
+
+        data = self.body.read(len(buffer))
+        if not data:
+            self.close_body()
+            return 0
+
+        buffer[:len(data)] = data
+        self.position += len(data)
+        self.body_position = self.position
+        return len(data)
+
+def detect_archive_format(key):
+    """Detect the archive format of an object from its key"""
+    lower_key = key.lower()
+    for suffix, archive_format in ARCHIVE_SUFFIXES:
+        if lower_key.endswith(suffix):
+            return archive_format
+    return None
+
+def digest_stream(fileobj):
+    """Calculate the SHA-256 digest and size of a stream, reading it in chunks"""
+    hash_obj = hashlib.sha256()
+    size = 0
+
+    while True:
+        chunk = fileobj.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        hash_obj.update(chunk)
+        size += len(chunk)
+
+    return hash_obj.hexdigest(), size
+
+def build_member_manifest(bucket, key, response, archive_format):
+    """Build a per-member digest manifest for an archive in a single pass"""
+    members = []
+
+    if archive_format == 'tar':
+        # Stream mode reads members in order without seeking or buffering the archive
+        with tarfile.open(fileobj=response['Body'], mode='r|*') as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                digest, size = digest_stream(archive.extractfile(member))
+                members.append({
+                    'name': member.name,
+                    'size': size,
+                    'sha256': digest
+                })
+
+    elif archive_format == 'zip':
+        # The zip directory sits at the end of the file, so read it with ranged requests
+        raw = S3RangeReader(bucket, key, response.get('ContentLength', 0), response['ETag'])
+        with io.BufferedReader(raw, buffer_size=CHUNK_SIZE) as fileobj, zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                with archive.open(info) as member:
+                    digest, size = digest_stream(member)
+                members.append({
+                    'name': info.filename,
+                    'size': size,
+                    'sha256': digest
+                })
+
+    elif archive_format == 'gzip':
+        # A plain gzip file holds a single member: the decompressed content
+        with gzip.GzipFile(fileobj=response['Body'], mode='rb') as member:
+            digest, size = digest_stream(member)
+        members.append({
+            'name': key.split('/')[-1][:-len('.gz')],
+            'size': size,
+            'sha256': digest
+        })
+
+    return members
+
 def calculate_hash(data, previous_hash=None):
     """Calculate a hash of the data, incorporating the previous hash if available"""
     # Create a JSON string of the data
@@ -80,25 +253,49 @@ def handler(event, context):
             # Extract dataset ID from the key
             dataset_id = extract_dataset_id(key)
             
-            # Get the object
-            response = s3_client.get_object(
-                Bucket=bucket,
-                Key=key
-            )
+            # Archives are hashed member by member instead of being read into memory
+            archive_format = detect_archive_format(key)
             
-            # Read the object content
-            content = response['Body'].read().decode('utf-8')
+            if archive_format == 'zip':
+                # Zip members are read with ranged requests, so only fetch the metadata here
+                response = s3_client.head_object(
+                    Bucket=bucket,
+                    Key=key
+                )
+            else:
+                # Get the object
+                response = s3_client.get_object(
+                    Bucket=bucket,
+                    Key=key
+                )
             
-            # Try to parse as JSON
-            try:
-                data = json.loads(content)
-            except json.JSONDecodeError:
-                # If not JSON, create a simple metadata object
+            if archive_format:
                 data = {
                     'filename': key,
                     'content_type': response.get('ContentType', 'application/octet-stream'),
-                    'size': response.get('ContentLength', 0)
+                    'size': response.get('ContentLength', 0),
+                    'archive_format': archive_format
                 }
+                
+                try:
+                    data['members'] = build_member_manifest(bucket, key, response, archive_format)
+                except ARCHIVE_ERRORS as e:
+                    # Fall back to the plain metadata record for unreadable archives
+                    print(f"Error reading archive {key}: {str(e)}")
+            else:
+                # Read the object content
+                content = response['Body'].read().decode('utf-8')
+                
+                # Try to parse as JSON
+                try:
+                    data = json.loads(content)
+                except json.JSONDecodeError:
+                    # If not JSON, create a simple metadata object
+                    data = {
+                        'filename': key,
+                        'content_type': response.get('ContentType', 'application/octet-stream'),
+                        'size': response.get('ContentLength', 0)
+                    }
             
             # Get the latest hash for this dataset
             previous_hash = get_latest_hash(ledger_bucket, dataset_id)
@@ -3,10 +3,189 @@ import os
 import boto3
 import hashlib
 import base64
+import hmac
+import time
+from collections import OrderedDict
 from datetime import datetime
 
 # Initialize AWS clients
 s3_client = boto3.client('s3')
+dynamodb_client = boto3.client('dynamodb')
+secretsmanager_client = boto3.client('secretsmanager')
+
+# Upper bound (in bytes, approximate) for the in-process verification cache
+CACHE_MAX_BYTES = int(os.environ.get('VERIFY_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+
+# Rough per-entry overhead of the OrderedDict slot, tuple key and dict value
+CACHE_ENTRY_OVERHEAD = 400
+
+# DynamoDB accepts at most 100 keys per BatchGetItem and 25 items per BatchWriteItem
+SHARED_CACHE_GET_BATCH_SIZE = 100
+SHARED_CACHE_WRITE_BATCH_SIZE = 25
+
+# Attempts made for each shared cache batch before unprocessed items are given up on
+SHARED_CACHE_MAX_ATTEMPTS = 3
+
+# Ledger records are immutable (Object Lock), so a record that verified once
+# under a given S3 key and ETag will always verify again. The cache lives at
+# module level so it survives across warm invocations of this container.
+verified_cache = OrderedDict()
+verified_cache_bytes = 0
+
+# The shared cache table is mutable, unlike the ledger, so its entries are
+# signed with a key from Secrets Manager and unsigned or forged entries are
+# ignored. The key is fetched once per container.
+shared_cache_signing_key = None
+
+def cache_entry_size(cache_key, entry):
+    """Approximate the memory used by a cache entry"""
+    size = CACHE_ENTRY_OVERHEAD + len(cache_key[0]) + len(cache_key[1])
+    for value in entry.values():
+        size += len(value or '')
+    return size
+
+def cache_get(cache_key):
+    """Get a verified record from the in-process cache, marking it recently used"""
+    entry = verified_cache.get(cache_key)
+    if entry is not None:
+        verified_cache.move_to_end(cache_key)
+    return entry
+
+def cache_put(cache_key, entry):
+    """Store a verified record in the in-process cache, evicting the least recently used"""
+    global verified_cache_bytes
+
+    if cache_key in verified_cache:
+        verified_cache.move_to_end(cache_key)
+        return
+
+    verified_cache[cache_key] = entry
+    verified_cache_bytes += cache_entry_size(cache_key, entry)
+
+    while verified_cache_bytes > CACHE_MAX_BYTES and verified_cache:
+        evicted_key, evicted_entry = verified_cache.popitem(last=False)
+        verified_cache_bytes -= cache_entry_size(evicted_key, evicted_entry)
+
+def shared_cache_id(cache_key):
+    """Build the shared cache item key from an S3 key and ETag"""
+    return f"{cache_key[0]}#{cache_key[1]}"
+
+def get_shared_cache_signing_key():
+    """Get the key used to sign shared cache entries, or None if it is unavailable"""
+    global shared_cache_signing_key
+
+    if shared_cache_signing_key is None:
+        secret_arn = os.environ.get('VERIFY_CACHE_SECRET_ARN')
+        if not secret_arn:
+            return None
+
+        try:
+            secret = secretsmanager_client.get_secret_value(SecretId=secret_arn)
+            shared_cache_signing_key = secret['SecretString'].encode()
+        except Exception as e:
+            print(f"Error reading shared verification cache key: {str(e)}")
+            return None
+
+    return shared_cache_signing_key
+
+def sign_shared_cache_entry(signing_key, item_id, entry):
+    """Calculate the HMAC of a shared cache entry, binding it to its S3 key and ETag"""
+    message = json.dumps([item_id, entry['hash'], entry.get('previous_hash'), entry.get('timestamp')])
+    return hmac.new(signing_key, message.encode(), hashlib.sha256).hexdigest()
+
+def shared_cache_get_many(cache_keys):
+    """Fetch verified records from the shared cache table, if one is configured"""
+    table_name = os.environ.get('VERIFY_CACHE_TABLE')
+    if not table_name or not cache_keys:
+        return {}
+
+    # Without the signing key shared entries cannot be trusted
+    signing_key = get_shared_cache_signing_key()
+    if signing_key is None:
+        return {}
+
+    ids = {shared_cache_id(cache_key): cache_key for cache_key in cache_keys}
+    found = {}
+
+    try:
+        pending = list(ids.keys())
+        while pending:
+            batch = pending[:SHARED_CACHE_GET_BATCH_SIZE]
+            pending = pending[SHARED_CACHE_GET_BATCH_SIZE:]
+            request = {
+                table_name: {
+                    'Keys': [{'cache_key': {'S': item_id}} for item_id in batch]
+                }
+            }
+
+            for attempt in range(SHARED_CACHE_MAX_ATTEMPTS):
+                if attempt:
+                    time.sleep(0.05 * 2 ** attempt)
+                response = dynamodb_client.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(table_name, []):
+                    item_id = item['cache_key']['S']
+                    entry = {
+                        'hash': item['hash']['S'],
+                        'previous_hash': item.get('previous_hash', {}).get('S'),
+                        'timestamp': item.get('timestamp', {}).get('S')
+                    }
+
+                    signature = item.get('signature', {}).get('S', '')
+                    expected = sign_shared_cache_entry(signing_key, item_id, entry)
+                    if not hmac.compare_digest(signature, expected):
+                        # Re-verify from the ledger rather than trust a tampered entry
+                        print(f"Ignoring shared verification cache entry with invalid signature: {item_id}")
+                        continue
+
+                    found[ids[item_id]] = entry
+                request = response.get('UnprocessedKeys')
+                if not request:
+                    break
+    except Exception as e:
+        # The shared tier is an optimisation only; fall back to re-verifying
+        print(f"Error reading shared verification cache: {str(e)}")
+
+    return found
+
+def shared_cache_put_many(entries):
+    """Write newly verified records to the shared cache table, if one is configured"""
+    table_name = os.environ.get('VERIFY_CACHE_TABLE')
+    if not table_name or not entries:
+        return
+
+    signing_key = get_shared_cache_signing_key()
+    if signing_key is None:
+        return
+
+    requests = []
+    for cache_key, entry in entries:
+        item_id = shared_cache_id(cache_key)
+        item = {
+            'cache_key': {'S': item_id},
+            'hash': {'S': entry['hash']},
+            'signature': {'S': sign_shared_cache_entry(signing_key, item_id, entry)}
+        }
+        if entry.get('previous_hash'):
+            item['previous_hash'] = {'S': entry['previous_hash']}
+        if entry.get('timestamp'):
+            item['timestamp'] = {'S': entry['timestamp']}
+        requests.append({'PutRequest': {'Item': item}})
+
+    try:
+        while requests:
+            batch = requests[:SHARED_CACHE_WRITE_BATCH_SIZE]
+            requests = requests[SHARED_CACHE_WRITE_BATCH_SIZE:]
+            request = {table_name: batch}
+
+            for attempt in range(SHARED_CACHE_MAX_ATTEMPTS):
+                if attempt:
+                    time.sleep(0.05 * 2 ** attempt)
+                response = dynamodb_client.batch_write_item(RequestItems=request)
+                request = response.get('UnprocessedItems')
+                if not request:
+                    break
+    except Exception as e:
+        print(f"Error writing shared verification cache: {str(e)}")
 
 def calculate_hash(data, previous_hash=None):
     """Calculate a hash of the data, incorporating the previous hash if available"""
@@ -42,23 +221,43 @@ def verify_chain(dataset_id):
         # Sort records by timestamp (assuming timestamp is part of the key)
         records = sorted(response['Contents'], key=lambda x: x['Key'])
         
+        # Look up records we have not seen in this container in the shared cache
+        missing = [
+            (record['Key'], record['ETag']) for record in records
+            if cache_get((record['Key'], record['ETag'])) is None
+        ]
+        for cache_key, entry in shared_cache_get_many(missing).items():
+            cache_put(cache_key, entry)
+        
         # Verify the chain
         previous_hash = None
         verified_records = []
+        newly_verified = []
         
         for record in records:
-            # Get the record
-            obj = s3_client.get_object(
-                Bucket=ledger_bucket,
-                Key=record['Key']
-            )
+            cache_key = (record['Key'], record['ETag'])
+            cached = cache_get(cache_key)
             
-            # Parse the record
-            audit_record = json.loads(obj['Body'].read().decode('utf-8'))
-            
-            # Get the stored hash and previous hash
-            stored_hash = audit_record.get('hash')
-            stored_previous_hash = audit_record.get('previous_hash')
+            if cached is not None:
+                # The record's own hash was already verified; only the link remains
+                stored_hash = cached['hash']
+                stored_previous_hash = cached['previous_hash']
+                timestamp = cached['timestamp']
+            else:
+                # Get the record
+                obj = s3_client.get_object(
+                    Bucket=ledger_bucket,
+                    Key=record['Key'],
+                    IfMatch=record['ETag']
+                )
+                
+                # Parse the record
+                audit_record = json.loads(obj['Body'].read().decode('utf-8'))
+                
+                # Get the stored hash and previous hash
+                stored_hash = audit_record.get('hash')
+                stored_previous_hash = audit_record.get('previous_hash')
+                timestamp = audit_record.get('timestamp')
             
             # Verify previous hash matches
             if previous_hash != stored_previous_hash:
@@ -67,15 +266,25 @@ def verify_chain(dataset_id):
                     'error': f"Chain broken at record {record['Key']}. Expected previous hash {previous_hash}, got {stored_previous_hash}"
                 }
             
-            # Calculate the hash
-            calculated_hash = calculate_hash(audit_record['data'], previous_hash)
-            
-            # Verify the hash
-            if calculated_hash != stored_hash:
-                return {
-                    'verified': False,
-                    'error': f"Hash mismatch at record {record['Key']}. Expected {stored_hash}, calculated {calculated_hash}"
+            if cached is None:
+                # Calculate the hash
+                calculated_hash = calculate_hash(audit_record['data'], previous_hash)
+                
+                # Verify the hash
+                if calculated_hash != stored_hash:
+                    return {
+                        'verified': False,
+                        'error': f"Hash mismatch at record {record['Key']}. Expected {stored_hash}, calculated {calculated_hash}"
+                    }
+                
+                # Remember the record so later invocations can skip the download
+                entry = {
+                    'hash': stored_hash,
+                    'previous_hash': stored_previous_hash,
+                    'timestamp': timestamp
                 }
+                cache_put(cache_key, entry)
+                newly_verified.append((cache_key, entry))
             
             # Update previous hash for next iteration
             previous_hash = stored_hash
@@ -83,10 +292,13 @@ def verify_chain(dataset_id):
             # Add to verified records
             verified_records.append({
                 'key': record['Key'],
-                'timestamp': audit_record.get('timestamp'),
+                'timestamp': timestamp,
                 'hash': stored_hash
             })
         
+        # Share the work done here with other containers
+        shared_cache_put_many(newly_verified)
+        
         return {
             'verified': True,
             'dataset_id': dataset_id,
@@ -39,7 +39,8 @@ def handler(event, context):
         conn = psycopg2.connect(
             host=secret['host'],
             port=secret.get('port', 5432),
-            dbname=secret.get('dbname', 'gracedb'),
+            # Same database the ProvenanceLogger and lineage Lambdas use through the Data API
+            dbname=secret.get('dbname', 'postgres'),
             user=secret['username'],
             password=secret['password']
         )
@@ -0,0 +1,166 @@
+import json
+import os
+import boto3
+import logging
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Initialize AWS clients
+rds_data = boto3.client('rds-data')
+
+# Default and maximum number of hops followed by lineage queries
+DEFAULT_LINEAGE_DEPTH = 10
+MAX_LINEAGE_DEPTH = 50
+
+# Column to start from and column to follow for each lineage direction
+LINEAGE_DIRECTIONS = {
+    'downstream': ('source', 'target'),
+    'upstream': ('target', 'source')
+}
+
+# Set once lineage_edges is known to exist, so warm invocations skip the DDL
+lineage_tables_ready = False
+
+def ensure_lineage_tables_exist(secret_arn, cluster_arn):
+    """Ensure the lineage_edges adjacency table and its indexes exist, once per container"""
+    global lineage_tables_ready
+    
+    if lineage_tables_ready:
+        return
+    
+    # Mirrors infrastructure/sql/init-audit-schema.sql, so a query made before
+    # the first provenance event finds an empty graph rather than no table
+    statements = [
+        """
+        CREATE TABLE IF NOT EXISTS lineage_edges (
+            source TEXT NOT NULL,
+            target TEXT NOT NULL,
+            audit_record_id INTEGER,
+            PRIMARY KEY (source, target)
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_lineage_edges_target ON lineage_edges(target, source)"
+    ]
+    
+    try:
+        for sql in statements:
+            rds_data.execute_statement(
+                resourceArn=cluster_arn,
+                secretArn=secret_arn,
+                database='postgres',
+                sql=sql
+            )
+        lineage_tables_ready = True
+    except Exception as e:
+        logger.error(f"Error creating lineage tables: {str(e)}")
+        raise
+
+def normalize_data_reference(reference):
+    """Normalize an S3 object reference (URI or ARN) to an s3://bucket/key node name"""
+    reference = reference.strip()
+    if reference.startswith('arn:aws:s3:::'):
+        return 's3://' + reference[len('arn:aws:s3:::'):]
+    return reference
+
+def parse_lineage_request(params):
+    """Validate lineage query parameters, returning the node, direction and depth"""
+    node = params.get('node')
+    if not isinstance(node, str) or not node.strip():
+        raise ValueError("Lineage requests need a non-empty 'node'")
+    
+    direction = params.get('direction', 'downstream')
+    if direction not in LINEAGE_DIRECTIONS:
+        raise ValueError(f"Invalid lineage direction {direction}, expected one of {sorted(LINEAGE_DIRECTIONS)}")
+    
+    max_depth = params.get('max_depth', DEFAULT_LINEAGE_DEPTH)
+    if isinstance(max_depth, bool):
+        raise ValueError(f"Lineage depth must be an integer, got {max_depth}")
+    try:
+        max_depth = int(max_depth)
+    except (TypeError, ValueError):
+        raise ValueError(f"Lineage depth must be an integer, got {max_depth}")
+    if max_depth < 1 or max_depth > MAX_LINEAGE_DEPTH:
+        raise ValueError(f"Lineage depth must be between 1 and {MAX_LINEAGE_DEPTH}, got {max_depth}")
+    
+    return normalize_data_reference(node), direction, max_depth
+
+def get_lineage(node, direction='downstream', max_depth=DEFAULT_LINEAGE_DEPTH):
+    """Get the nodes transitively upstream or downstream of a node, up to a depth limit"""
+    secret_arn = os.environ['DATABASE_SECRET_ARN']
+    cluster_arn = os.environ['DATABASE_CLUSTER_ARN']
+    from_column, to_column = LINEAGE_DIRECTIONS[direction]
+    
+    # UNION (not UNION ALL) keeps cycles from growing the result beyond nodes x depth
+    sql = f"""
+    WITH RECURSIVE lineage(node, depth) AS (
+        SELECT e.{to_column}, 1
+        FROM lineage_edges e
+        WHERE e.{from_column} = :node
+        UNION
+        SELECT e.{to_column}, l.depth + 1
+        FROM lineage l
+        JOIN lineage_edges e ON e.{from_column} = l.node
+        WHERE l.depth < :max_depth
+    )
+    SELECT node, MIN(depth) AS depth
+    FROM lineage
+    WHERE node <> :node
+    GROUP BY node
+    ORDER BY depth, node
+    """
+    
+    parameters = [
+        {'name': 'node', 'value': {'stringValue': node}},
+        {'name': 'max_depth', 'value': {'longValue': max_depth}}
+    ]
+    
+    ensure_lineage_tables_exist(secret_arn, cluster_arn)
+    
+    response = rds_data.execute_statement(
+        resourceArn=cluster_arn,
+        secretArn=secret_arn,
+        database='postgres',
+        sql=sql,
+        parameters=parameters
+    )
+    
+    nodes = [
+        {'node': row[0]['stringValue'], 'depth': row[1]['longValue']}
+        for row in response.get('records', [])
+    ]
+    
+    return {
+        'node': node,
+        'direction': direction,
+        'max_depth': max_depth,
+        'nodes': nodes
+    }
+
+def response(status_code, body):
+    """Build an API Gateway proxy response"""
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': json.dumps(body)
+    }
+
+def handler(event, context):
+    """Lambda handler function for GET /lineage"""
+    try:
+        params = event.get('queryStringParameters') or {}
+        
+        try:
+            node, direction, max_depth = parse_lineage_request(params)
+        except ValueError as e:
+            logger.error(f"Invalid lineage request: {str(e)}")
+            return response(400, {'error': str(e)})
+        
+        return response(200, get_lineage(node, direction, max_depth))
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return response(500, {'error': str(e)})
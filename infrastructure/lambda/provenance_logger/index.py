@@ -14,6 +14,22 @@ logger.setLevel(logging.INFO)
 # Initialize AWS clients
 secretsmanager = boto3.client('secretsmanager')
 rds_data = boto3.client('rds-data')
+s3_client = boto3.client('s3')
+
+# User metadata on derived objects listing the S3 objects they were derived from
+# (comma-separated s3:// URIs), set by the tools that write them
+DERIVED_FROM_METADATA_KEY = 'grace-derived-from'
+
+# Lineage edges written per BatchExecuteStatement call
+LINEAGE_INSERT_BATCH_SIZE = 500
+
+# Default and maximum audit records read per lineage backfill invocation; the
+# cap keeps the page within the Data API's response size limit
+DEFAULT_BACKFILL_RECORDS = 500
+MAX_BACKFILL_RECORDS = 1000
+
+# Set once lineage_edges is known to exist, so warm invocations skip the DDL
+lineage_tables_ready = False
 
 def get_db_credentials():
     """Get database credentials from Secrets Manager"""
@@ -64,6 +80,196 @@ def ensure_audit_table_exists(secret_arn, cluster_arn):
         logger.error(f"Error creating table: {str(e)}")
         raise
 
+def ensure_lineage_tables_exist(secret_arn, cluster_arn):
+    """Ensure the lineage_edges adjacency table and its indexes exist, once per container"""
+    global lineage_tables_ready
+    
+    if lineage_tables_ready:
+        return
+    
+    # Mirrors infrastructure/sql/init-audit-schema.sql; the primary key serves
+    # downstream lookups and the target index upstream ones
+    statements = [
+        """
+        CREATE TABLE IF NOT EXISTS lineage_edges (
+            source TEXT NOT NULL,
+            target TEXT NOT NULL,
+            audit_record_id INTEGER,
+            PRIMARY KEY (source, target)
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_lineage_edges_target ON lineage_edges(target, source)"
+    ]
+    
+    try:
+        for sql in statements:
+            rds_data.execute_statement(
+                resourceArn=cluster_arn,
+                secretArn=secret_arn,
+                database='postgres',
+                sql=sql
+            )
+        logger.info("Table lineage_edges created or already exists")
+        lineage_tables_ready = True
+    except Exception as e:
+        logger.error(f"Error creating lineage tables: {str(e)}")
+        raise
+
+def normalize_data_reference(reference):
+    """Normalize an S3 object reference (URI or ARN) to an s3://bucket/key node name"""
+    reference = reference.strip()
+    if reference.startswith('arn:aws:s3:::'):
+        return 's3://' + reference[len('arn:aws:s3:::'):]
+    if reference.startswith('s3://'):
+        return reference
+    return None
+
+def parse_data_references(value):
+    """Parse a comma-separated string or list of S3 object references"""
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list):
+        return []
+    
+    references = []
+    for item in value:
+        reference = normalize_data_reference(item) if isinstance(item, str) else None
+        if reference and reference not in references:
+            references.append(reference)
+    return references
+
+def get_event_object(event_data):
+    """Get the bucket and key of the object an S3 Object Created event is about"""
+    detail = event_data.get('detail')
+    if not isinstance(detail, dict):
+        return None, None
+    
+    bucket = (detail.get('bucket') or {}).get('name')
+    key = (detail.get('object') or {}).get('key')
+    if not bucket or not key:
+        return None, None
+    return bucket, key
+
+def get_derived_from(bucket, key):
+    """Read the inputs a derived object declares in its grace-derived-from metadata"""
+    try:
+        response = s3_client.head_object(Bucket=bucket, Key=key)
+        return parse_data_references(response.get('Metadata', {}).get(DERIVED_FROM_METADATA_KEY, ''))
+    except Exception as e:
+        logger.error(f"Error reading derived-from metadata for s3://{bucket}/{key}: {str(e)}")
+        return []
+
+def extract_lineage_edges(event_data):
+    """Extract input->output lineage edges from a logged S3 Object Created event"""
+    bucket, key = get_event_object(event_data)
+    if not bucket:
+        return []
+    
+    target = f"s3://{bucket}/{key}"
+    return [
+        (source, target)
+        for source in parse_data_references(event_data.get('derivedFrom', []))
+        if source != target
+    ]
+
+def record_lineage_edges(secret_arn, cluster_arn, edges):
+    """Add (source, target, audit_record_id) edges to the adjacency table, ignoring ones already recorded"""
+    sql = """
+    INSERT INTO lineage_edges (source, target, audit_record_id)
+    VALUES (:source, :target, :audit_record_id)
+    ON CONFLICT (source, target) DO NOTHING
+    """
+    
+    for start in range(0, len(edges), LINEAGE_INSERT_BATCH_SIZE):
+        parameter_sets = []
+        for source, target, record_id in edges[start:start + LINEAGE_INSERT_BATCH_SIZE]:
+            record_id_value = {'longValue': record_id} if record_id is not None else {'isNull': True}
+            parameter_sets.append([
+                {'name': 'source', 'value': {'stringValue': source}},
+                {'name': 'target', 'value': {'stringValue': target}},
+                {'name': 'audit_record_id', 'value': record_id_value}
+            ])
+        
+        rds_data.batch_execute_statement(
+            resourceArn=cluster_arn,
+            secretArn=secret_arn,
+            database='postgres',
+            sql=sql,
+            parameterSets=parameter_sets
+        )
+
+def backfill_lineage_edges(after_id=0, max_records=DEFAULT_BACKFILL_RECORDS):
+    """Rebuild lineage edges from audit_records with an id above after_id"""
+    sql = """
+    SELECT id, event_data::text
+    FROM audit_records
+    WHERE id > :after_id
+    ORDER BY id
+    LIMIT :max_records
+    """
+    
+    parameters = [
+        {'name': 'after_id', 'value': {'longValue': after_id}},
+        {'name': 'max_records', 'value': {'longValue': max_records}}
+    ]
+    
+    try:
+        secret_arn = get_db_credentials()
+        cluster_arn = get_cluster_arn()
+        
+        ensure_audit_table_exists(secret_arn, cluster_arn)
+        ensure_lineage_tables_exist(secret_arn, cluster_arn)
+        
+        response = rds_data.execute_statement(
+            resourceArn=cluster_arn,
+            secretArn=secret_arn,
+            database='postgres',
+            sql=sql,
+            parameters=parameters
+        )
+        rows = response.get('records', [])
+        
+        edges = []
+        last_id = after_id
+        for row in rows:
+            last_id = row[0]['longValue']
+            event_data = json.loads(row[1]['stringValue'])
+            edges.extend((source, target, last_id) for source, target in extract_lineage_edges(event_data))
+        
+        record_lineage_edges(secret_arn, cluster_arn, edges)
+        logger.info(f"Backfilled {len(edges)} lineage edges from {len(rows)} audit records")
+        
+        return {
+            'records': len(rows),
+            'edges': len(edges),
+            'last_id': last_id,
+            'complete': len(rows) < max_records
+        }
+    except Exception as e:
+        logger.error(f"Error in backfill_lineage_edges: {str(e)}")
+        raise
+
+def parse_backfill_request(event):
+    """Validate a lineage backfill request, returning its after_id and max_records"""
+    values = {}
+    for name, default, minimum, maximum in [
+        ('after_id', 0, 0, None),
+        ('max_records', DEFAULT_BACKFILL_RECORDS, 1, MAX_BACKFILL_RECORDS)
+    ]:
+        value = event.get(name, default)
+        if isinstance(value, bool):
+            raise ValueError(f"{name} must be an integer, got {value}")
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be an integer, got {value}")
+        if value < minimum or (maximum is not None and value > maximum):
+            bounds = f"between {minimum} and {maximum}" if maximum is not None else f"at least {minimum}"
+            raise ValueError(f"{name} must be {bounds}, got {value}")
+        values[name] = value
+    
+    return values['after_id'], values['max_records']
+
 def calculate_hash(data, previous_hash=None):
     """Calculate a hash of the data, incorporating the previous hash if available"""
     # Create a JSON string of the data
@@ -111,8 +317,17 @@ def log_provenance(event_data):
         logger.info(f"Secret ARN: {secret_arn}")
         logger.info(f"Cluster ARN: {cluster_arn}")
         
-        # Ensure the audit_records table exists
+        # Ensure the audit_records and lineage tables exist
         ensure_audit_table_exists(secret_arn, cluster_arn)
+        ensure_lineage_tables_exist(secret_arn, cluster_arn)
+        
+        # Record the inputs a derived object declares, so the audited event
+        # carries its own lineage and the graph can be rebuilt from it
+        bucket, key = get_event_object(event_data)
+        if bucket and 'derivedFrom' not in event_data:
+            derived_from = get_derived_from(bucket, key)
+            if derived_from:
+                event_data = dict(event_data, derivedFrom=derived_from)
         
         # Get the last hash from the database (if any)
         previous_hash = get_last_hash(secret_arn, cluster_arn)
@@ -152,11 +367,21 @@ def log_provenance(event_data):
         
         logger.info(f"Provenance record created with ID: {record_id}")
         
+        # Keep the lineage graph up to date with this event's edges
+        edges = extract_lineage_edges(event_data)
+        try:
+            record_lineage_edges(secret_arn, cluster_arn, [(source, target, record_id) for source, target in edges])
+            logger.info(f"Recorded {len(edges)} lineage edges")
+        except Exception as e:
+            # The audit record is already written; backfill_lineage can recover the edges
+            logger.error(f"Error recording lineage edges for record {record_id}: {str(e)}")
+        
         return {
             'id': record_id,
             'timestamp': timestamp,
             'hash': current_hash,
-            'previous_hash': previous_hash
+            'previous_hash': previous_hash,
+            'lineage_edges': len(edges)
         }
     except Exception as e:
         logger.error(f"Error in log_provenance: {str(e)}")
@@ -191,4 +416,43 @@ def handler(event, context):
                 'message': 'Error logging provenance',
                 'error': str(e)
             })
-        }
\ No newline at end of file
+        }
+
+def backfill_handler(event, context):
+    """Admin entry point that rebuilds lineage edges from logged audit records"""
+    try:
+        # Extract AWS account ID and region from the context
+        if context:
+            os.environ['AWS_ACCOUNT_ID'] = context.invoked_function_arn.split(':')[4]
+            os.environ['AWS_REGION'] = context.invoked_function_arn.split(':')[3]
+        
+        try:
+            after_id, max_records = parse_backfill_request(event)
+        except ValueError as e:
+            logger.error(f"Invalid backfill request: {str(e)}")
+            return {
+                'statusCode': 400,
+                'body': json.dumps({
+                    'message': 'Invalid backfill request',
+                    'error': str(e)
+                })
+            }
+        
+        result = backfill_lineage_edges(after_id, max_records)
+        
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': 'Lineage backfilled successfully',
+                'result': result
+            })
+        }
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'message': 'Error backfilling lineage',
+                'error': str(e)
+            })
+        }
@@ -3,18 +3,27 @@ import * as cognito from 'aws-cdk-lib/aws-cognito';
 import * as apigateway from 'aws-cdk-lib/aws-apigateway';
 import * as lambda from 'aws-cdk-lib/aws-lambda';
 import * as iam from 'aws-cdk-lib/aws-iam';
+import * as dynamodb from 'aws-cdk-lib/aws-dynamodb';
+import * as secretsmanager from 'aws-cdk-lib/aws-secretsmanager';
 import * as path from 'path';
 import { Construct } from 'constructs';
 
 export interface GraceApiStackProps extends cdk.StackProps {
   ledgerBucketName: string;
   isProduction?: boolean;
+  // Share verified ledger records between ChainVerifier containers via DynamoDB
+  enableSharedVerifyCache?: boolean;
+  // Audit database used by the lineage endpoint; the endpoint is only created when set
+  databaseSecret?: secretsmanager.ISecret;
+  databaseClusterArn?: string;
 }
 
 export class GraceApiStack extends cdk.Stack {
   public readonly userPool: cognito.UserPool;
   public readonly api: apigateway.RestApi;
   public readonly chainVerifierFunction: lambda.Function;
+  public readonly verifyCacheTable?: dynamodb.Table;
+  public readonly lineageQueryFunction?: lambda.Function;
 
   constructor(scope: Construct, id: string, props: GraceApiStackProps) {
     super(scope, id, props);
@@ -82,6 +91,35 @@ export class GraceApiStack extends cdk.Stack {
       ],
     }));
 
+    // Optionally create the shared verification cache table
+    if (props.enableSharedVerifyCache) {
+      this.verifyCacheTable = new dynamodb.Table(this, 'VerifyCacheTable', {
+        partitionKey: { name: 'cache_key', type: dynamodb.AttributeType.STRING },
+        billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+        // The table only holds derived data and can always be rebuilt from the ledger
+        removalPolicy: cdk.RemovalPolicy.DESTROY,
+      });
+
+      // Entries are signed so a write to the table alone cannot make a forged record verify
+      const verifyCacheKey = new secretsmanager.Secret(this, 'VerifyCacheSigningKey', {
+        description: 'HMAC key for signing ChainVerifier shared cache entries',
+        generateSecretString: {
+          passwordLength: 64,
+          excludePunctuation: true,
+        },
+      });
+
+      // Only the batch calls the verifier makes
+      this.chainVerifierFunction.addToRolePolicy(new iam.PolicyStatement({
+        actions: ['dynamodb:BatchGetItem', 'dynamodb:BatchWriteItem'],
+        resources: [this.verifyCacheTable.tableArn],
+      }));
+      verifyCacheKey.grantRead(this.chainVerifierFunction);
+
+      this.chainVerifierFunction.addEnvironment('VERIFY_CACHE_TABLE', this.verifyCacheTable.tableName);
+      this.chainVerifierFunction.addEnvironment('VERIFY_CACHE_SECRET_ARN', verifyCacheKey.secretArn);
+    }
+
     // 4. Create API endpoint with Lambda integration
     const audits = this.api.root.addResource('audits');
     const datasetId = audits.addResource('{datasetId}');
@@ -94,6 +132,35 @@ export class GraceApiStack extends cdk.Stack {
       }
     );
 
+    // 5. Optionally create the lineage query endpoint
+    if (props.databaseSecret && props.databaseClusterArn) {
+      this.lineageQueryFunction = new lambda.Function(this, 'LineageQueryFunction', {
+        runtime: lambda.Runtime.PYTHON_3_9,
+        handler: 'index.handler',
+        code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/lineage_query')),
+        environment: {
+          DATABASE_SECRET_ARN: props.databaseSecret.secretArn,
+          DATABASE_CLUSTER_ARN: props.databaseClusterArn,
+        },
+        timeout: cdk.Duration.seconds(30),
+      });
+
+      // Single statements through the Data API only; no batch writes or transactions
+      props.databaseSecret.grantRead(this.lineageQueryFunction);
+      this.lineageQueryFunction.addToRolePolicy(new iam.PolicyStatement({
+        actions: ['rds-data:ExecuteStatement'],
+        resources: [props.databaseClusterArn],
+      }));
+
+      const lineage = this.api.root.addResource('lineage');
+      lineage.addMethod('GET',
+        new apigateway.LambdaIntegration(this.lineageQueryFunction), {
+          authorizer: authorizer,
+          authorizationType: apigateway.AuthorizationType.COGNITO,
+        }
+      );
+    }
+
     // Outputs
     new cdk.CfnOutput(this, 'UserPoolId', {
       value: this.userPool.userPoolId,
@@ -16,6 +16,7 @@ export interface GraceLogicStackProps extends cdk.NestedStackProps {
 
 export class GraceLogicStack extends cdk.NestedStack {
   public readonly provenanceLogger: lambda.Function;
+  public readonly lineageBackfill: lambda.Function;
 
   constructor(scope: Construct, id: string, props: GraceLogicStackProps) {
     super(scope, id, props);
@@ -93,10 +94,45 @@ export class GraceLogicStack extends cdk.NestedStack {
       resources: ['*']
     }));
 
-    // Output the Lambda function ARN
+    // Create the admin-only Lambda function that rebuilds lineage edges from audit records
+    this.lineageBackfill = new lambda.Function(this, 'LineageBackfill', {
+      runtime: lambda.Runtime.PYTHON_3_9,
+      handler: 'index.backfill_handler',
+      code: lambda.Code.fromAsset(path.join(__dirname, '../lambda/provenance_logger')),
+      vpc,
+      vpcSubnets: {
+        subnetType: ec2.SubnetType.PRIVATE_WITH_EGRESS
+      },
+      securityGroups: [lambdaSecurityGroup],
+      environment: {
+        DATABASE_SECRET_ARN: databaseSecret.secretArn,
+        DATABASE_ENDPOINT: props.databaseEndpoint,
+        ENVIRONMENT: isProduction ? 'production' : 'development'
+      },
+      timeout: cdk.Duration.minutes(5),
+      memorySize: 256,
+      description: 'Admin Lambda function for rebuilding the lineage graph from audit records',
+      functionName: `grace-lineage-backfill-${envSuffix}`
+    });
+
+    databaseSecret.grantRead(this.lineageBackfill);
+    this.lineageBackfill.addToRolePolicy(new iam.PolicyStatement({
+      actions: [
+        'rds-data:ExecuteStatement',
+        'rds-data:BatchExecuteStatement'
+      ],
+      resources: ['*']
+    }));
+
+    // Output the Lambda function ARNs
     new cdk.CfnOutput(this, 'ProvenanceLoggerArn', {
       value: this.provenanceLogger.functionArn,
       description: 'The ARN of the ProvenanceLogger Lambda function'
     });
+
+    new cdk.CfnOutput(this, 'LineageBackfillArn', {
+      value: this.lineageBackfill.functionArn,
+      description: 'The ARN of the LineageBackfill Lambda function'
+    });
   }
 }
\ No newline at end of file
@@ -40,6 +40,10 @@ export class GraceMvpStack extends cdk.Stack {
       environment: {
         LEDGER_BUCKET_NAME: this.ledgerBucket.bucketName,
       },
+      // Archives are hashed member by member, which can take minutes for multi-GB uploads
+      timeout: cdk.Duration.minutes(15),
+      // CPU scales with memory; 1769 MB is one full vCPU for hashing and decompression
+      memorySize: 1769,
     });
 
     // Grant the Lambda function permissions to read from uploads bucket and write to ledger bucket
@@ -24,6 +24,9 @@ export class GraceOrchestrationStack extends cdk.NestedStack {
     const isProduction = props?.isProduction ?? false;
     const envSuffix = isProduction ? 'prod' : 'dev';
 
+    // Allow the ProvenanceLogger to read the grace-derived-from metadata of new objects
+    props.dataBucket.grantRead(props.provenanceLogger);
+
     // Create the first task that invokes the ProvenanceLogger Lambda function
     const logProvenanceTask = new tasks.LambdaInvoke(this, 'LogProvenance', {
       lambdaFunction: props.provenanceLogger,
@@ -59,4 +59,16 @@ BEGIN
     SUM(CASE WHEN chain_status = 'INVALID' THEN 1 ELSE 0 END) AS invalid_records
   FROM audit.chain_verification;
 END;
-$$ LANGUAGE plpgsql;
\ No newline at end of file
+$$ LANGUAGE plpgsql;
+
+-- Create the lineage graph used by the ProvenanceLogger for upstream/downstream queries.
+-- Each row is an input->output edge; the primary key serves downstream lookups
+-- and idx_lineage_edges_target serves upstream ones.
+CREATE TABLE IF NOT EXISTS public.lineage_edges (
+  source TEXT NOT NULL,
+  target TEXT NOT NULL,
+  audit_record_id INTEGER,
+  PRIMARY KEY (source, target)
+);
+
+CREATE INDEX IF NOT EXISTS idx_lineage_edges_target ON public.lineage_edges(target, source);
@@ -0,0 +1,39 @@
+import importlib.util
+import os
+
+import pytest
+
+# boto3 clients are created at import time and need a region
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-west-2')
+
+LAMBDA_DIR = os.path.join(os.path.dirname(__file__), '..', 'infrastructure', 'lambda')
+
+def load_lambda(name):
+    """Load a fresh copy of a Lambda function's index module"""
+    spec = importlib.util.spec_from_file_location(
+        f"{name}_index",
+        os.path.join(LAMBDA_DIR, name, 'index.py')
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture
+def chain_verifier(monkeypatch):
+    monkeypatch.setenv('LEDGER_BUCKET_NAME', 'ledger')
+    monkeypatch.delenv('VERIFY_CACHE_TABLE', raising=False)
+    return load_lambda('chain_verifier')
+
+@pytest.fixture
+def audit_handler():
+    return load_lambda('audit_handler')
+
+@pytest.fixture
+def provenance_logger():
+    return load_lambda('provenance_logger')
+
+@pytest.fixture
+def lineage_query(monkeypatch):
+    monkeypatch.setenv('DATABASE_SECRET_ARN', 'secret')
+    monkeypatch.setenv('DATABASE_CLUSTER_ARN', 'arn:aws:rds:eu-west-2:123456789012:cluster:grace')
+    return load_lambda('lineage_query')
@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import io
+import json
+import random
+import struct
+import tarfile
+import zipfile
+
+import pytest
+from botocore.exceptions import ClientError
+
+MEMBERS = {
+    'GSM1.csv.gz': b'cell,count\n' * 50000,
+    'nested/GSM2.txt': bytes(range(256)) * 4000
+}
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def build_tar(mode):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        directory = tarfile.TarInfo('nested')
+        directory.type = tarfile.DIRTYPE
+        archive.addfile(directory)
+        for name, data in MEMBERS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+def build_zip(members=MEMBERS):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('nested/', b'')
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+def patch_central_directory(data, flag_bits=None, compress_type=None):
+    """Rewrite the flags or compression method of the last member in a zip's directory"""
+    data = bytearray(data)
+    entry = data.rindex(b'PK\x01\x02')
+    if flag_bits is not None:
+        struct.pack_into('<H', data, entry + 8, flag_bits)
+    if compress_type is not None:
+        struct.pack_into('<H', data, entry + 10, compress_type)
+    return bytes(data)
+
+class StubS3:
+    """Uploads and ledger bucket stub that records ranged reads and ledger writes"""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.etag = '"v1"'
+        self.ranges = []
+        self.ledger = []
+
+    def head_object(self, Bucket, Key):
+        return {'ContentLength': len(self.objects[Key]), 'ETag': self.etag}
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        data = self.objects[Key]
+        if Range:
+            if IfMatch != self.etag:
+                raise ClientError({'Error': {'Code': 'PreconditionFailed'}}, 'GetObject')
+            self.ranges.append(Range)
+            start, end = Range[len('bytes='):].split('-')
+            data = data[int(start):int(end) + 1 if end else None]
+        return {'Body': io.BytesIO(data), 'ContentLength': len(data), 'ETag': self.etag}
+
+    def list_objects_v2(self, Bucket, Prefix):
+        return {}
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.ledger.append(json.loads(Body))
+
+def run_handler(audit_handler, monkeypatch, key, data):
+    monkeypatch.setenv('LEDGER_BUCKET_NAME', 'ledger')
+    s3 = StubS3({key: data})
+    audit_handler.s3_client = s3
+    event = {'Records': [{'s3': {'bucket': {'name': 'uploads'}, 'object': {'key': key}}}]}
+
+    response = audit_handler.handler(event, None)
+
+    assert response['statusCode'] == 200
+    return s3, s3.ledger[0]['data']
+
+@pytest.mark.parametrize('key, archive_format, data', [
+    ('GSE84465_RAW.tar', 'tar', build_tar('w')),
+    ('GSE84465_RAW.tar.gz', 'tar', build_tar('w:gz')),
+    ('GSE84465_RAW.tar.xz', 'tar', build_tar('w:xz')),
+    ('GSE84465_RAW.zip', 'zip', build_zip())
+])
+def test_archive_members_are_digested(audit_handler, monkeypatch, key, archive_format, data):
+    s3, record = run_handler(audit_handler, monkeypatch, key, data)
+
+    assert record['archive_format'] == archive_format
+    assert record['size'] == len(data)
+    assert record['members'] == [
+        {'name': name, 'size': len(content), 'sha256': sha256(content)}
+        for name, content in MEMBERS.items()
+    ]
+
+def test_gzip_records_decompressed_content(audit_handler, monkeypatch):
+    content = MEMBERS['nested/GSM2.txt']
+    _, record = run_handler(audit_handler, monkeypatch, 'data/GSM2.txt.gz', gzip.compress(content))
+
+    assert record['archive_format'] == 'gzip'
+    assert record['members'] == [{'name': 'GSM2.txt', 'size': len(content), 'sha256': sha256(content)}]
+
+def test_zip_ranged_reads_are_pinned_to_etag(audit_handler, monkeypatch):
+    monkeypatch.setenv('LEDGER_BUCKET_NAME', 'ledger')
+    s3 = StubS3({'GSE84465_RAW.zip': build_zip()})
+    audit_handler.s3_client = s3
+    response = s3.head_object(Bucket='uploads', Key='GSE84465_RAW.zip')
+
+    # The object is overwritten after the manifest scan started
+    s3.etag = '"v2"'
+
+    with pytest.raises(ClientError):
+        audit_handler.build_member_manifest('uploads', 'GSE84465_RAW.zip', response, 'zip')
+
+def test_zip_is_read_with_few_ranged_gets(audit_handler, monkeypatch):
+    # Incompressible members, so the zip spans many read chunks
+    members = {f"member{i}.bin": random.Random(i).randbytes(3 * 1024 * 1024) for i in range(8)}
+    data = build_zip(members)
+
+    s3, record = run_handler(audit_handler, monkeypatch, 'large.zip', data)
+
+    assert [member['sha256'] for member in record['members']] == [sha256(content) for content in members.values()]
+    # A few short reads locating the directory at the end, then one body streamed through every member
+    assert len(s3.ranges) <= 5
+
+@pytest.mark.parametrize('key, data', [
+    ('broken.tar', b'not a tar archive'),
+    ('broken.tar.xz', b'\xfd7zXZ\x00' + b'\x00' * 64),
+    ('broken.zip', b'PK\x03\x04' + b'\x00' * 64),
+    ('broken.gz', b'\x1f\x8b\x08\x00' + b'\x00' * 64)
+])
+def test_unreadable_archive_falls_back_to_metadata(audit_handler, monkeypatch, key, data):
+    _, record = run_handler(audit_handler, monkeypatch, key, data)
+
+    assert record['filename'] == key
+    assert 'members' not in record
+
+@pytest.mark.parametrize('patch', [
+    {'flag_bits': 0x1},
+    # Deflate64, written by Windows for large zips
+    {'compress_type': 9}
+])
+def test_unreadable_zip_member_falls_back_to_metadata(audit_handler, monkeypatch, patch):
+    data = patch_central_directory(build_zip(), **patch)
+
+    _, record = run_handler(audit_handler, monkeypatch, 'GSE84465_RAW.zip', data)
+
+    assert record['filename'] == 'GSE84465_RAW.zip'
+    assert 'members' not in record
+
+def test_corrupt_zip_member_falls_back_to_metadata(audit_handler, monkeypatch):
+    data = bytearray(build_zip())
+    # Corrupt the deflate stream of the first member, past its local header
+    offset = data.index(b'GSM1.csv.gz') + len('GSM1.csv.gz') + 10
+    data[offset:offset + 32] = b'\xff' * 32
+
+    _, record = run_handler(audit_handler, monkeypatch, 'GSE84465_RAW.zip', bytes(data))
+
+    assert 'members' not in record
@@ -0,0 +1,167 @@
+import io
+import json
+
+def build_chain(chain_verifier, count, dataset_id='ds1'):
+    """Build a valid chain of ledger records keyed by S3 key"""
+    records = {}
+    previous_hash = None
+    for i in range(count):
+        data = {'index': i}
+        hash_value = chain_verifier.calculate_hash(data, previous_hash)
+        records[f"audit/{dataset_id}/{i:04d}.json"] = {
+            'data': data,
+            'timestamp': str(i),
+            'hash': hash_value,
+            'previous_hash': previous_hash
+        }
+        previous_hash = hash_value
+    return records
+
+class StubS3:
+    """Ledger bucket stub that counts object downloads"""
+
+    def __init__(self, records):
+        self.records = records
+        self.etags = {key: '"v1"' for key in records}
+        self.gets = []
+
+    def list_objects_v2(self, Bucket, Prefix):
+        return {'Contents': [
+            {'Key': key, 'ETag': self.etags[key]}
+            for key in self.records if key.startswith(Prefix)
+        ]}
+
+    def get_object(self, Bucket, Key, IfMatch=None):
+        assert IfMatch == self.etags[Key]
+        self.gets.append(Key)
+        return {'Body': io.BytesIO(json.dumps(self.records[Key]).encode())}
+
+class StubDynamoDB:
+    """Shared cache table stub that leaves the first write batch partly unprocessed"""
+
+    def __init__(self):
+        self.items = {}
+        self.write_calls = []
+        self.unprocessed_once = True
+
+    def batch_get_item(self, RequestItems):
+        (table_name, request), = RequestItems.items()
+        found = [self.items[key['cache_key']['S']] for key in request['Keys'] if key['cache_key']['S'] in self.items]
+        return {'Responses': {table_name: found}}
+
+    def batch_write_item(self, RequestItems):
+        (table_name, requests), = RequestItems.items()
+        self.write_calls.append(len(requests))
+        unprocessed = []
+        if self.unprocessed_once:
+            self.unprocessed_once = False
+            unprocessed, requests = requests[-1:], requests[:-1]
+        for request in requests:
+            item = request['PutRequest']['Item']
+            self.items[item['cache_key']['S']] = item
+        return {'UnprocessedItems': {table_name: unprocessed} if unprocessed else {}}
+
+class StubSecretsManager:
+    def get_secret_value(self, SecretId):
+        return {'SecretString': 'signing-key'}
+
+def use_shared_cache(chain_verifier, monkeypatch, records):
+    monkeypatch.setenv('VERIFY_CACHE_TABLE', 'verify-cache')
+    monkeypatch.setenv('VERIFY_CACHE_SECRET_ARN', 'secret')
+    monkeypatch.setattr(chain_verifier.time, 'sleep', lambda seconds: None)
+    dynamodb = StubDynamoDB()
+    chain_verifier.s3_client = StubS3(records)
+    chain_verifier.dynamodb_client = dynamodb
+    chain_verifier.secretsmanager_client = StubSecretsManager()
+    return dynamodb
+
+def start_cold_container(chain_verifier, records):
+    chain_verifier.verified_cache.clear()
+    chain_verifier.verified_cache_bytes = 0
+    s3 = StubS3(records)
+    chain_verifier.s3_client = s3
+    return s3
+
+def test_warm_call_uses_cache(chain_verifier):
+    s3 = StubS3(build_chain(chain_verifier, 3))
+    chain_verifier.s3_client = s3
+
+    first = chain_verifier.verify_chain('ds1')
+    second = chain_verifier.verify_chain('ds1')
+
+    assert first['verified'] and second['verified']
+    assert second['records'] == first['records']
+    assert len(s3.gets) == 3
+
+def test_changed_etag_is_reverified(chain_verifier):
+    records = build_chain(chain_verifier, 3)
+    s3 = StubS3(records)
+    chain_verifier.s3_client = s3
+    chain_verifier.verify_chain('ds1')
+
+    # Tamper with a record; the new ETag must bypass the cached result
+    key = 'audit/ds1/0001.json'
+    records[key]['data'] = {'index': 'tampered'}
+    s3.etags[key] = '"v2"'
+
+    result = chain_verifier.verify_chain('ds1')
+
+    assert not result['verified']
+    assert 'Hash mismatch' in result['error']
+    assert s3.gets[-1] == key
+
+def test_cache_evicts_least_recently_used(chain_verifier):
+    entry = {'hash': 'h', 'previous_hash': None, 'timestamp': 't'}
+    entry_size = chain_verifier.cache_entry_size(('k0', 'e'), entry)
+    chain_verifier.CACHE_MAX_BYTES = entry_size * 2
+
+    chain_verifier.cache_put(('k0', 'e'), entry)
+    chain_verifier.cache_put(('k1', 'e'), entry)
+    chain_verifier.cache_get(('k0', 'e'))
+    chain_verifier.cache_put(('k2', 'e'), entry)
+
+    assert list(chain_verifier.verified_cache) == [('k0', 'e'), ('k2', 'e')]
+    assert chain_verifier.verified_cache_bytes == entry_size * 2
+
+def test_shared_cache_batches_writes_and_serves_cold_containers(chain_verifier, monkeypatch):
+    records = build_chain(chain_verifier, 30)
+    dynamodb = use_shared_cache(chain_verifier, monkeypatch, records)
+
+    assert chain_verifier.verify_chain('ds1')['verified']
+
+    # Two batches of at most 25, plus a retry of the unprocessed item
+    assert dynamodb.write_calls == [25, 1, 5]
+    assert len(dynamodb.items) == 30
+
+    # A cold container only lists the chain
+    s3 = start_cold_container(chain_verifier, records)
+
+    assert chain_verifier.verify_chain('ds1')['verified']
+    assert s3.gets == []
+
+def test_forged_shared_cache_entry_is_reverified(chain_verifier, monkeypatch):
+    records = build_chain(chain_verifier, 3)
+    dynamodb = use_shared_cache(chain_verifier, monkeypatch, records)
+    assert chain_verifier.verify_chain('ds1')['verified']
+
+    # A forged ledger object gets a matching table entry, but cannot sign it
+    key = 'audit/ds1/0002.json'
+    records[key] = dict(records[key], data={'index': 'forged'}, hash='forged-hash')
+    item = dynamodb.items[f'{key}#"v1"']
+    item['hash'] = {'S': 'forged-hash'}
+    item['signature'] = {'S': 'f' * 64}
+
+    s3 = start_cold_container(chain_verifier, records)
+    result = chain_verifier.verify_chain('ds1')
+
+    assert not result['verified']
+    assert 'Hash mismatch' in result['error']
+    assert s3.gets == [key]
+
+def test_shared_cache_is_disabled_without_signing_key(chain_verifier, monkeypatch):
+    records = build_chain(chain_verifier, 3)
+    dynamodb = use_shared_cache(chain_verifier, monkeypatch, records)
+    monkeypatch.delenv('VERIFY_CACHE_SECRET_ARN')
+
+    assert chain_verifier.verify_chain('ds1')['verified']
+    assert dynamodb.write_calls == []
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+class StubRdsData:
+    """RDS Data API stub that records statements and returns canned rows"""
+
+    def __init__(self, records):
+        self.statements = []
+        self.records = records
+
+    def execute_statement(self, resourceArn, secretArn, database, sql, parameters=None):
+        self.statements.append((sql, parameters))
+        if 'WITH RECURSIVE' in sql:
+            return {'records': self.records}
+        return {}
+
+@pytest.fixture
+def query_module(lineage_query):
+    lineage_query.rds_data = StubRdsData([
+        [{'stringValue': 's3://grace-data/derived/counts.csv'}, {'longValue': 1}],
+        [{'stringValue': 's3://grace-data/derived/figure.png'}, {'longValue': 2}]
+    ])
+    return lineage_query
+
+def api_event(**params):
+    return {'httpMethod': 'GET', 'path': '/lineage', 'queryStringParameters': params or None}
+
+def test_downstream_lineage(query_module):
+    response = query_module.handler(api_event(node='arn:aws:s3:::grace-data/raw/GSE84465_RAW.tar', max_depth='3'), None)
+
+    body = json.loads(response['body'])
+    assert response['statusCode'] == 200
+    assert response['headers']['Access-Control-Allow-Origin'] == '*'
+    assert body == {
+        'node': 's3://grace-data/raw/GSE84465_RAW.tar',
+        'direction': 'downstream',
+        'max_depth': 3,
+        'nodes': [
+            {'node': 's3://grace-data/derived/counts.csv', 'depth': 1},
+            {'node': 's3://grace-data/derived/figure.png', 'depth': 2}
+        ]
+    }
+
+    sql, parameters = query_module.rds_data.statements[-1]
+    assert 'WHERE e.source = :node' in sql
+    assert parameters[1] == {'name': 'max_depth', 'value': {'longValue': 3}}
+
+def test_upstream_lineage_follows_edges_backwards(query_module):
+    query_module.handler(api_event(node='s3://grace-data/derived/figure.png', direction='upstream'), None)
+
+    sql, _ = query_module.rds_data.statements[-1]
+    assert 'WHERE e.target = :node' in sql
+    assert 'ON e.target = l.node' in sql
+
+def test_table_is_ensured_once_per_container(query_module):
+    query_module.handler(api_event(node='s3://grace-data/raw.tar'), None)
+    query_module.handler(api_event(node='s3://grace-data/raw.tar'), None)
+
+    statements = [sql for sql, _ in query_module.rds_data.statements]
+    assert sum('CREATE' in sql for sql in statements) == 2
+    assert sum('WITH RECURSIVE' in sql for sql in statements) == 2
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'node': ' '},
+    {'node': 's3://grace-data/raw.tar', 'direction': 'sideways'},
+    {'node': 's3://grace-data/raw.tar', 'max_depth': 'deep'},
+    {'node': 's3://grace-data/raw.tar', 'max_depth': '0'},
+    {'node': 's3://grace-data/raw.tar', 'max_depth': '51'}
+])
+def test_invalid_request_is_rejected(query_module, params):
+    response = query_module.handler(api_event(**params), None)
+
+    assert response['statusCode'] == 400
+    assert query_module.rds_data.statements == []
+
+def test_database_errors_are_reported(query_module):
+    def fail(**kwargs):
+        raise Exception('cluster unavailable')
+    query_module.rds_data.execute_statement = fail
+
+    response = query_module.handler(api_event(node='s3://grace-data/raw.tar'), None)
+
+    assert response['statusCode'] == 500
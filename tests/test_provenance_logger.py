@@ -0,0 +1,154 @@
+import json
+
+import pytest
+
+def object_created_event(bucket, key):
+    """Payload sent by the LogProvenance task in grace-orchestration-stack.ts"""
+    return {
+        'eventSource': 'S3',
+        'eventType': 'ObjectCreated',
+        'timestamp': '2026-10-19T12:00:00Z',
+        'detail': {
+            'version': '0',
+            'bucket': {'name': bucket},
+            'object': {'key': key, 'size': 1024, 'etag': 'abc', 'sequencer': '00'},
+            'request-id': 'req',
+            'requester': '123456789012',
+            'reason': 'PutObject'
+        },
+        'resources': [f"arn:aws:s3:::{bucket}"]
+    }
+
+class StubRdsData:
+    """RDS Data API stub that records statements and returns canned rows"""
+
+    def __init__(self, select_records=None):
+        self.statements = []
+        self.batches = []
+        self.select_records = select_records or []
+        self.fail_batches = False
+
+    def execute_statement(self, resourceArn, secretArn, database, sql, parameters=None):
+        self.statements.append((sql, parameters))
+        if 'INSERT INTO audit_records' in sql:
+            return {'records': [[{'longValue': 7}]]}
+        if 'SELECT' in sql and 'hash FROM' not in sql:
+            return {'records': self.select_records}
+        return {}
+
+    def batch_execute_statement(self, resourceArn, secretArn, database, sql, parameterSets):
+        if self.fail_batches:
+            raise Exception('value too long')
+        self.batches.append(parameterSets)
+        return {}
+
+    def inserted_edges(self):
+        return [
+            tuple(next(iter(param['value'].values())) for param in parameter_set)
+            for batch in self.batches for parameter_set in batch
+        ]
+
+class StubS3:
+    def __init__(self, metadata):
+        self.metadata = metadata
+
+    def head_object(self, Bucket, Key):
+        return {'Metadata': self.metadata.get(f"s3://{Bucket}/{Key}", {})}
+
+class StubSecretsManager:
+    def get_secret_value(self, SecretId):
+        return {'SecretString': '{}'}
+
+@pytest.fixture
+def logger_module(provenance_logger, monkeypatch):
+    monkeypatch.setenv('DATABASE_SECRET_ARN', 'secret')
+    monkeypatch.setenv('DATABASE_ENDPOINT', 'cluster.eu-west-2.rds.amazonaws.com')
+    provenance_logger.rds_data = StubRdsData()
+    provenance_logger.secretsmanager = StubSecretsManager()
+    provenance_logger.s3_client = StubS3({
+        's3://grace-data/derived/counts.csv': {
+            'grace-derived-from': 's3://grace-data/raw/GSE84465_RAW.tar, arn:aws:s3:::grace-data/ref/genome.fa'
+        }
+    })
+    return provenance_logger
+
+def test_derived_object_links_to_its_inputs(logger_module):
+    event = object_created_event('grace-data', 'derived/counts.csv')
+
+    response = logger_module.handler(event, None)
+
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['result']['lineage_edges'] == 2
+    assert logger_module.rds_data.inserted_edges() == [
+        ('s3://grace-data/raw/GSE84465_RAW.tar', 's3://grace-data/derived/counts.csv', 7),
+        ('s3://grace-data/ref/genome.fa', 's3://grace-data/derived/counts.csv', 7)
+    ]
+
+    # The declared inputs are part of the hashed audit record
+    insert_parameters = next(p for sql, p in logger_module.rds_data.statements if 'INSERT INTO audit_records' in sql)
+    event_data = json.loads(insert_parameters[1]['value']['stringValue'])
+    assert event_data['derivedFrom'] == [
+        's3://grace-data/raw/GSE84465_RAW.tar',
+        's3://grace-data/ref/genome.fa'
+    ]
+
+def test_raw_object_has_no_edges(logger_module):
+    response = logger_module.handler(object_created_event('grace-data', 'raw/GSE84465_RAW.tar'), None)
+
+    assert response['statusCode'] == 200
+    assert logger_module.rds_data.batches == []
+
+def test_failed_edge_insert_keeps_audit_record(logger_module):
+    logger_module.rds_data.fail_batches = True
+
+    response = logger_module.handler(object_created_event('grace-data', 'derived/counts.csv'), None)
+
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['result']['id'] == 7
+
+def test_backfill_rebuilds_edges_from_audit_records(logger_module):
+    event = object_created_event('grace-data', 'derived/counts.csv')
+    event['derivedFrom'] = ['s3://grace-data/raw/GSE84465_RAW.tar']
+    logger_module.rds_data.select_records = [
+        [{'longValue': 3}, {'stringValue': json.dumps(object_created_event('grace-data', 'raw/GSE84465_RAW.tar'))}],
+        [{'longValue': 4}, {'stringValue': json.dumps(event)}]
+    ]
+
+    response = logger_module.backfill_handler({'max_records': '2'}, None)
+
+    assert json.loads(response['body'])['result'] == {'records': 2, 'edges': 1, 'last_id': 4, 'complete': False}
+    assert logger_module.rds_data.inserted_edges() == [
+        ('s3://grace-data/raw/GSE84465_RAW.tar', 's3://grace-data/derived/counts.csv', 4)
+    ]
+
+def test_lineage_tables_are_created_once_per_container(logger_module):
+    logger_module.handler(object_created_event('grace-data', 'raw/GSE84465_RAW.tar'), None)
+    logger_module.handler(object_created_event('grace-data', 'derived/counts.csv'), None)
+
+    ddl = [sql for sql, _ in logger_module.rds_data.statements if 'lineage_edges' in sql]
+    assert len(ddl) == 2
+
+@pytest.mark.parametrize('request_fields', [
+    {'after_id': 'latest'},
+    {'after_id': -1},
+    {'after_id': None},
+    {'max_records': 0},
+    {'max_records': -5},
+    {'max_records': 1001},
+    {'max_records': True}
+])
+def test_invalid_backfill_request_is_rejected(logger_module, request_fields):
+    response = logger_module.backfill_handler(request_fields, None)
+
+    assert response['statusCode'] == 400
+    assert logger_module.rds_data.statements == []
+
+def test_logging_errors_are_not_reported_as_bad_requests(logger_module, monkeypatch):
+    def fail(*args, **kwargs):
+        raise ValueError('bad value')
+    monkeypatch.setattr(logger_module, 'calculate_hash', fail)
+
+    response = logger_module.handler(object_created_event('grace-data', 'raw/GSE84465_RAW.tar'), None)
+
+    assert response['statusCode'] == 500
+    assert json.loads(response['body'])['message'] == 'Error logging provenance'